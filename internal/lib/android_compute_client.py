@@ -78,7 +78,14 @@ class AndroidComputeClient(gcompute_client.ComputeClient):
         self._orientation = acloud_config.orientation
         self._resolution = acloud_config.resolution
         self._metadata = acloud_config.metadata_variable.copy()
+        self._metadata["cfg_sta_display_resolution"] = self._resolution
+        self._metadata["t_force_orientation"] = self._orientation
         self._ssh_public_key_path = acloud_config.ssh_public_key_path
+        # Content of the ssh public key, loaded on first use.
+        self._ssh_public_key = None
+        # A dictionary that maps (machine_type, zone) to a machine type
+        # resource. Machine types don't change, so we only fetch them once.
+        self._machine_types = {}
 
     @classmethod
     def _FormalizeName(cls, name):
@@ -170,6 +177,26 @@ class AndroidComputeClient(gcompute_client.ComputeClient):
             uuid=uuid.uuid4().hex[:8]).replace("_", "-").lower()
         return cls._FormalizeName(name)
 
+    def GetMachineType(self, machine_type, zone):
+        """Get a machine type resource, fetching it only once per client.
+
+        Both _CheckMachineSize and ComputeClient.CreateInstance look up
+        the same machine type, so cache the result to save an API call
+        for every instance we create.
+
+        Args:
+            machine_type: A string, name of the machine type.
+            zone: A string, e.g. "us-central1-f"
+
+        Returns:
+            A machine type resource in json.
+        """
+        key = (machine_type, zone)
+        if key not in self._machine_types:
+            self._machine_types[key] = super(
+                AndroidComputeClient, self).GetMachineType(machine_type, zone)
+        return self._machine_types[key]
+
     def CreateDisk(self, disk_name, source_image, size_gb):
         """Create a gce disk.
 
@@ -260,12 +287,13 @@ class AndroidComputeClient(gcompute_client.ComputeClient):
         if extra_disk_name:
             disk_args.extend(self._GetExtraDiskArgs(extra_disk_name))
         metadata = self._metadata.copy()
-        metadata["cfg_sta_display_resolution"] = self._resolution
-        metadata["t_force_orientation"] = self._orientation
 
         # Add per-instance ssh key
         if self._ssh_public_key_path:
-            rsa = self._LoadSshPublicKey(self._ssh_public_key_path)
+            if self._ssh_public_key is None:
+                self._ssh_public_key = self._LoadSshPublicKey(
+                    self._ssh_public_key_path)
+            rsa = self._ssh_public_key
             logger.info("ssh_public_key_path is specified in config: %s, "
                         "will add the key to the instance.",
                         self._ssh_public_key_path)
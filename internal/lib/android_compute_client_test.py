@@ -127,6 +127,41 @@ class AndroidComputeClientTest(driver_test_lib.BaseDriverTest):
                   expected_metadata, self.NETWORK, self.ZONE,
                   expected_disk_args)
 
+    def testCreateInstanceLoadsSshPublicKeyOnce(self):
+        """Test CreateInstance only reads the ssh public key once."""
+        self.Patch(
+            gcompute_client.ComputeClient,
+            "CompareMachineSize",
+            return_value=1)
+        self.Patch(gcompute_client.ComputeClient, "CreateInstance")
+        self.Patch(
+            gcompute_client.ComputeClient,
+            "_GetDiskArgs",
+            return_value=[{"fake_arg": "fake_value"}])
+        self.Patch(
+            android_compute_client.AndroidComputeClient,
+            "_LoadSshPublicKey",
+            return_value="fake-rsa")
+        self.android_compute_client._ssh_public_key_path = "/fake/key.pub"
+        self.android_compute_client.CreateInstance("instance-1", self.IMAGE)
+        self.android_compute_client.CreateInstance("instance-2", self.IMAGE)
+        self.android_compute_client._LoadSshPublicKey.assert_called_once_with(
+            "/fake/key.pub")
+
+    def testGetMachineTypeIsCached(self):
+        """Test GetMachineType only fetches a machine type once."""
+        machine_info = {"guestCpus": 1, "memoryMb": 1024}
+        self.Patch(
+            gcompute_client.ComputeClient,
+            "GetMachineType",
+            return_value=machine_info)
+        for _ in range(2):
+            self.assertEqual(
+                self.android_compute_client.GetMachineType(
+                    self.MACHINE_TYPE, self.ZONE), machine_info)
+        gcompute_client.ComputeClient.GetMachineType.assert_called_once_with(
+            self.MACHINE_TYPE, self.ZONE)
+
     def testCheckMachineSizeMeetsRequirement(self):
         """Test CheckMachineSize when machine size meets requirement."""
         self.Patch(
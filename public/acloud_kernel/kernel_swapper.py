@@ -34,11 +34,26 @@ ALL_SCOPES = ' '.join([android_build_client.AndroidBuildClient.SCOPE,
                        android_compute_client.AndroidComputeClient.SCOPE])
 
 # ssh flags used to communicate with the Cloud Android instance.
+# The Control* options let consecutive ssh and scp calls to the same
+# instance share one connection instead of handshaking every time. The
+# control socket lives under ~/.ssh so other users can't plant one.
+# BatchMode and ConnectTimeout make ssh fail instead of waiting on a
+# password prompt or an unreachable instance.
 SSH_FLAGS = [
-    '-q', '-o UserKnownHostsFile=/dev/null', '-o "StrictHostKeyChecking no"',
-    '-o ServerAliveInterval=10'
+    '-q', '-o', 'UserKnownHostsFile=/dev/null',
+    '-o', 'StrictHostKeyChecking=no', '-o', 'ServerAliveInterval=10',
+    '-o', 'BatchMode=yes', '-o', 'ConnectTimeout=10',
+    '-o', 'ControlMaster=auto',
+    '-o', 'ControlPath=%s' % os.path.expanduser('~/.ssh/acloud-%C'),
+    '-o', 'ControlPersist=120'
 ]
 
+# Retry settings for ssh and scp, see utils.Retry. Back off between
+# attempts so a busy or still-booting sshd gets time to recover.
+SSH_MAX_RETRIES = 2
+SSH_RETRY_SLEEP_SECS = 1
+SSH_RETRY_BACKOFF_FACTOR = 2
+
 # Shell commands run on target.
 MOUNT_CMD = ('if mountpoint -q /boot ; then umount /boot ; fi ; '
              'mount -t ext4 /dev/block/sda1 /boot')
@@ -52,7 +67,8 @@ class KernelSwapper(object):
         _compute_client: AndroidCopmuteClient object, manages AVD.
         _instance_name: string, name of Cloud Android Instance.
         _target_ip: string, IP address of Cloud Android instance.
-        _ssh_flags: string list, flags to be used with ssh and scp.
+        _ssh_cmd: string list, ssh command prefix for the target.
+        _scp_cmd: string list, scp command prefix.
     """
 
     def __init__(self, cfg, instance_name):
@@ -69,6 +85,9 @@ class KernelSwapper(object):
         self._instance_name = instance_name
         # IP of the Cloud Android instance.
         self._target_ip = self._compute_client.GetInstanceIP(instance_name)
+        # The ssh and scp command prefixes don't change for a given target.
+        self._ssh_cmd = ['ssh'] + SSH_FLAGS + ['root@%s' % self._target_ip]
+        self._scp_cmd = ['scp'] + SSH_FLAGS
 
     def SwapKernel(self, local_kernel_image):
         """Swaps the kernel image on target AVD with given kernel.
@@ -110,8 +129,8 @@ class KernelSwapper(object):
         Raises:
             subprocess.CalledProcessError: see _ShellCmd.
         """
-        cmd = 'scp %s %s root@%s:%s' % (' '.join(SSH_FLAGS), src_path,
-                                        self._target_ip, dest_path)
+        cmd = self._scp_cmd + [src_path,
+                               'root@%s:%s' % (self._target_ip, dest_path)]
         self._ShellCmd(cmd)
 
     def RebootTarget(self):
@@ -121,9 +140,22 @@ class KernelSwapper(object):
             subprocess.CalledProcessError: see _ShellCmd.
             errors.DeviceBootTimeoutError: if booting times out.
         """
-        self._ShellCmdOnTarget(REBOOT_CMD)
+        try:
+            self._ShellCmdOnTarget(REBOOT_CMD)
+        finally:
+            self._StopMasterConnection()
         self._compute_client.WaitForBoot(self._instance_name)
 
+    def _StopMasterConnection(self):
+        """Stops the ssh master connection to the target, if there is one.
+
+        The master started by ControlMaster=auto would otherwise outlive
+        acloud, still pointing at the rebooted instance. Errors are
+        ignored, e.g. when no master is running.
+        """
+        subprocess.call(self._ssh_cmd[:-1] +
+                        ['-O', 'exit', 'root@%s' % self._target_ip])
+
     def _ShellCmdOnTarget(self, target_cmd):
         """Runs a shell command on target Cloud Android instance.
 
@@ -133,22 +165,27 @@ class KernelSwapper(object):
         Raises:
             subprocess.CalledProcessError: see _ShellCmd.
         """
-        ssh_cmd = 'ssh %s root@%s' % (' '.join(SSH_FLAGS), self._target_ip)
-        host_cmd = ' '.join([ssh_cmd, '"%s"' % target_cmd])
-        self._ShellCmd(host_cmd)
+        self._ShellCmd(self._ssh_cmd + [target_cmd])
 
     def _ShellCmd(self, host_cmd):
-        """Runs a shell command on host device.
+        """Runs a command on host device.
+
+        The command is executed directly rather than through /bin/sh.
 
         Args:
-            host_cmd: string, shell command to be run on host.
+            host_cmd: string list, the command and its arguments to be run
+                      on host.
 
         Raises:
             subprocess.CalledProcessError: For any non-zero return code of
                                            host_cmd.
         """
+        # host_cmd has to be passed positionally, check_call has no |cmd|
+        # keyword argument.
         utils.Retry(
-            retry_checker=lambda e: isinstance(e, subprocess.CalledProcessError),
-            max_retries=2,
-            functor=lambda cmd: subprocess.check_call(cmd, shell=True),
-            cmd=host_cmd)
+            lambda e: isinstance(e, subprocess.CalledProcessError),
+            SSH_MAX_RETRIES,
+            subprocess.check_call,
+            SSH_RETRY_SLEEP_SECS,
+            SSH_RETRY_BACKOFF_FACTOR,
+            host_cmd)
@@ -15,7 +15,10 @@
 # limitations under the License.
 """Tests acloud.public.acloud_kernel.kernel_swapper."""
 
+import os
 import subprocess
+import time
+
 import mock
 
 import unittest
@@ -40,6 +43,7 @@ class KernelSwapperTest(driver_test_lib.BaseDriverTest):
             'AndroidComputeClient',
             return_value=self.compute_client)
         self.subprocess_call = self.Patch(subprocess, 'check_call')
+        self.subprocess_call_no_check = self.Patch(subprocess, 'call')
 
         self.fake_ip = '123.456.789.000'
         self.fake_instance = 'fake-instance'
@@ -47,51 +51,117 @@ class KernelSwapperTest(driver_test_lib.BaseDriverTest):
 
         self.kswapper = kernel_swapper.KernelSwapper(self.cfg,
                                                      self.fake_instance)
-        self.ssh_cmd_prefix = 'ssh %s root@%s' % (
-            ' '.join(kernel_swapper.SSH_FLAGS), self.fake_ip)
-        self.scp_cmd_prefix = 'scp %s' % ' '.join(kernel_swapper.SSH_FLAGS)
+        self.ssh_cmd_prefix = (['ssh'] + kernel_swapper.SSH_FLAGS +
+                               ['root@%s' % self.fake_ip])
+        self.ssh_exit_cmd = (['ssh'] + kernel_swapper.SSH_FLAGS +
+                             ['-O', 'exit', 'root@%s' % self.fake_ip])
+        self.scp_cmd_prefix = ['scp'] + kernel_swapper.SSH_FLAGS
 
     def testPushFile(self):
         """Test RebootTarget."""
         fake_src_path = 'fake-src'
         fake_dest_path = 'fake-dest'
-        scp_cmd = ' '.join([self.scp_cmd_prefix, '%s root@%s:%s' %
-                            (fake_src_path, self.fake_ip, fake_dest_path)])
+        scp_cmd = self.scp_cmd_prefix + [
+            fake_src_path, 'root@%s:%s' % (self.fake_ip, fake_dest_path)]
 
         self.kswapper.PushFile(fake_src_path, fake_dest_path)
-        self.subprocess_call.assert_called_once_with(scp_cmd, shell=True)
+        self.subprocess_call.assert_called_once_with(scp_cmd)
+
+    def testControlMasterEnabled(self):
+        """Test ssh and scp share a master connection."""
+        self.kswapper.PushFile('fake-src', 'fake-dest')
+        self.kswapper.RebootTarget()
+        self.assertEqual(self.subprocess_call.call_count, 2)
+        for mock_call in self.subprocess_call.call_args_list:
+            self.assertIn('ControlMaster=auto', mock_call[0][0])
+
+    def testSshFlagsDisablePrompts(self):
+        """Test ssh and scp never prompt or wait on an unreachable host."""
+        self.kswapper.RebootTarget()
+        self.kswapper.PushFile('fake-src', 'fake-dest')
+        self.assertEqual(self.subprocess_call.call_count, 2)
+        ssh_argv = self.subprocess_call.call_args_list[0][0][0]
+        scp_argv = self.subprocess_call.call_args_list[1][0][0]
+        self.assertEqual(ssh_argv[0], 'ssh')
+        self.assertEqual(scp_argv[0], 'scp')
+        for argv in (ssh_argv, scp_argv):
+            self.assertIn('BatchMode=yes', argv)
+            self.assertIn('ConnectTimeout=10', argv)
+
+    def testShellCmdRetriesWithBackoff(self):
+        """Test failed ssh/scp calls are retried with growing delays."""
+        self.subprocess_call.side_effect = subprocess.CalledProcessError(
+            1, 'scp')
+        sleep = self.Patch(time, 'sleep')
+        self.assertRaises(subprocess.CalledProcessError,
+                          self.kswapper.PushFile, 'fake-src', 'fake-dest')
+        self.assertEqual(self.subprocess_call.call_count, 3)
+        self.assertEqual(sleep.call_args_list, [mock.call(1), mock.call(2)])
 
     def testRebootTarget(self):
         """Test RebootTarget."""
         self.kswapper.RebootTarget()
-        reboot_cmd = ' '.join([
-            self.ssh_cmd_prefix, '"%s"' % kernel_swapper.REBOOT_CMD
-        ])
+        reboot_cmd = self.ssh_cmd_prefix + [kernel_swapper.REBOOT_CMD]
 
-        self.subprocess_call.assert_called_once_with(reboot_cmd, shell=True)
+        self.subprocess_call.assert_called_once_with(reboot_cmd)
         self.compute_client.WaitForBoot.assert_called_once_with(
             self.fake_instance)
 
+    def testRebootTargetStopsMasterConnection(self):
+        """Test RebootTarget stops the ssh master after the reboot."""
+        events = []
+        self.subprocess_call.side_effect = (
+            lambda cmd: events.append(('check_call', cmd)))
+        self.subprocess_call_no_check.side_effect = (
+            lambda cmd: events.append(('call', cmd)))
+        self.kswapper.RebootTarget()
+        reboot_cmd = self.ssh_cmd_prefix + [kernel_swapper.REBOOT_CMD]
+        self.assertEqual(events, [('check_call', reboot_cmd),
+                                  ('call', self.ssh_exit_cmd)])
+
+    def testRebootTargetStopsMasterConnectionOnFailure(self):
+        """Test the ssh master is stopped even if the reboot fails."""
+        self.subprocess_call.side_effect = subprocess.CalledProcessError(
+            255, 'ssh')
+        self.Patch(time, 'sleep')
+        self.assertRaises(subprocess.CalledProcessError,
+                          self.kswapper.RebootTarget)
+        self.subprocess_call_no_check.assert_called_once_with(
+            self.ssh_exit_cmd)
+        self.compute_client.WaitForBoot.assert_not_called()
+
     def testSwapKernel(self):
         """Test SwapKernel."""
         fake_local_kernel_image = 'fake-kernel'
-        mount_cmd = ' '.join([
-            self.ssh_cmd_prefix, '"%s"' % kernel_swapper.MOUNT_CMD
-        ])
-        scp_cmd = ' '.join([self.scp_cmd_prefix, '%s root@%s:%s' %
-                            (fake_local_kernel_image, self.fake_ip, '/boot')])
-        reboot_cmd = ' '.join([
-            self.ssh_cmd_prefix, '"%s"' % kernel_swapper.REBOOT_CMD
-        ])
+        mount_cmd = self.ssh_cmd_prefix + [kernel_swapper.MOUNT_CMD]
+        scp_cmd = self.scp_cmd_prefix + [
+            fake_local_kernel_image, 'root@%s:%s' % (self.fake_ip, '/boot')]
+        reboot_cmd = self.ssh_cmd_prefix + [kernel_swapper.REBOOT_CMD]
 
         self.kswapper.SwapKernel(fake_local_kernel_image)
         self.subprocess_call.assert_has_calls([
-            mock.call(
-                mount_cmd, shell=True), mock.call(
-                    scp_cmd, shell=True), mock.call(
-                        reboot_cmd, shell=True)
+            mock.call(mount_cmd), mock.call(scp_cmd), mock.call(reboot_cmd)
         ])
 
 
+
+class SshFlagsTest(driver_test_lib.BaseDriverTest):
+    """Test the ssh flags built at import time."""
+
+    def testControlPathIsPerUser(self):
+        """Test the ssh control socket is not in a shared directory."""
+        self.Patch(os.path, 'expanduser',
+                   side_effect=lambda path: path.replace('~', '/fake/home', 1))
+        # Rebuild SSH_FLAGS with the fake home and restore it afterwards.
+        self.addCleanup(reload, kernel_swapper)
+        reload(kernel_swapper)
+        control_paths = [flag for flag in kernel_swapper.SSH_FLAGS
+                         if flag.startswith('ControlPath=')]
+        self.assertEqual(len(control_paths), 1)
+        self.assertTrue(
+            control_paths[0].startswith('ControlPath=/fake/home/.ssh/'))
+        self.assertNotIn('/tmp/', control_paths[0])
+
+
 if __name__ == '__main__':
     unittest.main()